@@ -6,18 +6,34 @@ A performance-optimized fork of https://github.com/Shpota/github-activity-genera
 Uses git fast-import for ~2-3x faster commit generation.
 """
 import argparse
+import calendar
 import os
+import shutil
 import subprocess
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from random import randint
-from typing import Optional
+from functools import lru_cache, partial
+from random import choices
+from typing import Iterable, Iterator, Optional
 
 # Simple README content for generated repositories
 README_CONTENT = "# Contributions\n\nGenerated contribution history.\n"
 
+# Days rendered per work item when generating commits in parallel. Starting
+# a process pool costs more than rendering a default 365-day run (~4ms) and
+# was still slower at 3650 days x 20 commits, so --num_processes defaults
+# to 1 and parallel rendering is opt-in
+SHARD_DAYS = 64
+
+# Bytes to gather before writing to git fast-import (a typical pipe buffer)
+PIPE_BUFFER_SIZE = 64 * 1024
+
+# Local timezone offset for commit timestamps, e.g. b"+0200"
+TZ_OFFSET = time.strftime("%z").encode("utf-8")
+
 
 @dataclass(frozen=True)
 class Config:
@@ -32,6 +48,8 @@ class Config:
     user_email: Optional[str]
     force: bool
     append: bool
+    num_processes: int = 1
+    dry_run: Optional[str] = None
 
 
 def main(args: list[str] | None = None) -> None:
@@ -41,14 +59,6 @@ def main(args: list[str] | None = None) -> None:
     
     curr_date = datetime.now()
     
-    # Setup repository - either clone existing or create new
-    if config.append and config.repository:
-        directory = setup_append_mode(config.repository)
-    else:
-        directory = create_directory(config.repository, curr_date)
-        os.chdir(directory)
-        git("init", "-b", "main")
-    
     # Use provided credentials or read from global git config
     name = config.user_name or git_config("user.name")
     email = config.user_email or git_config("user.email")
@@ -58,6 +68,22 @@ def main(args: list[str] | None = None) -> None:
     if not email:
         sys.exit("Error: git user.email not configured. Use -ue or run: git config --global user.email 'you@example.com'")
     
+    # Dry run: save the fast-import stream to a file, no git operations
+    if config.dry_run:
+        chunks = iter_fast_import_chunks(config, name, email, curr_date)
+        with open(config.dry_run, "wb") as f:
+            write_stream(f.fileno(), chunks)
+        print(f"\n\x1b[32m✓ Fast-import stream written to {config.dry_run}\x1b[0m")
+        return
+    
+    # Setup repository - either fetch existing or create new
+    if config.append and config.repository:
+        directory = setup_append_mode(config.repository)
+    else:
+        directory = create_directory(config.repository, curr_date)
+        os.chdir(directory)
+        git("init", "-b", "main")
+    
     if config.user_name:
         git("config", "user.name", config.user_name)
     if config.user_email:
@@ -65,10 +91,11 @@ def main(args: list[str] | None = None) -> None:
     
     # Generate commits via fast-import
     parent_commit = get_head_commit() if config.append else None
-    stream = build_fast_import_stream(config, name, email, curr_date, parent_commit)
+    chunks = iter_fast_import_chunks(config, name, email, curr_date, parent_commit)
     
-    if stream:
-        git_with_input("fast-import", "--quiet", input_data=stream)
+    # Only populate the working tree for local-only runs; when pushing, HEAD
+    # already points at main (init -b main) and the history is all we need
+    if git_fast_import(chunks) and config.repository is None:
         git("checkout", "main")
     
     if config.repository:
@@ -81,32 +108,49 @@ def main(args: list[str] | None = None) -> None:
 
 
 def setup_append_mode(repository: str) -> str:
-    """Clone existing repo for append mode."""
-    name = repository.rstrip("/")
-    if name.endswith(".git"):
-        name = name[:-4]
-    name = name.rsplit("/", 1)[-1]
+    """Fetch the tip of an existing repo into a bare repo for append mode."""
+    name = repo_name_from_url(repository)
+    
+    if os.path.exists(name):
+        sys.exit(f"Error: Directory '{name}' already exists. Remove it or use a different name.")
     
-    print(f"Cloning {repository}...")
+    print(f"Fetching {repository}...")
     
+    # Commits are generated on top of the remote tip and pushed back, so a
+    # shallow fetch into a bare repo is enough - no working tree needed
+    git("init", "--bare", "-b", "main", name)
+    os.chdir(name)
+    git("remote", "add", "origin", repository)
     try:
-        subprocess.run(
-            ["git", "clone", repository, name],
+        result = subprocess.run(
+            ["git", "ls-remote", "origin", "HEAD"],
             check=True,
             capture_output=True,
         )
+        # An empty remote has no HEAD; leave main unborn so the generated
+        # history starts without a parent, as a clone of it would
+        if result.stdout.strip():
+            subprocess.run(
+                ["git", "fetch", "--depth=1", "origin", "HEAD"],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            git("update-ref", "refs/heads/main", "FETCH_HEAD")
     except subprocess.CalledProcessError as e:
+        # Don't leave a half-made repo behind to block the next attempt
+        os.chdir("..")
+        shutil.rmtree(name, ignore_errors=True)
         stderr = e.stderr.decode("utf-8").strip() if e.stderr else "Unknown error"
-        sys.exit(f"Clone failed: {stderr}")
+        sys.exit(f"Fetch failed: {stderr}")
     
-    os.chdir(name)
     return name
 
 
 def get_head_commit() -> Optional[str]:
     """Get current HEAD commit SHA, or None if no commits."""
     result = subprocess.run(
-        ["git", "rev-parse", "HEAD"],
+        ["git", "rev-parse", "--verify", "--quiet", "HEAD"],
         capture_output=True,
         text=True,
     )
@@ -115,74 +159,144 @@ def get_head_commit() -> Optional[str]:
     return None
 
 
-def build_fast_import_stream(
+def iter_fast_import_chunks(
     config: Config, 
     name: str, 
     email: str, 
     curr_date: datetime,
     parent_commit: Optional[str] = None,
-) -> str:
-    """Build git fast-import stream for all commits."""
-    parts: list[str] = []
-    mark = 1
+) -> Iterator[bytes]:
+    """Yield the git fast-import stream, one chunk per shard of days."""
+    start = curr_date.replace(hour=20, minute=0, second=0, microsecond=0)
+    start -= timedelta(config.days_before)
+    max_commits = max(1, min(config.max_commits, 20))
+    
+    # Draw every day's random decisions up front in two batched calls
+    total_days = config.days_before + config.days_after
+    freq_rolls = choices(range(101), k=total_days)
+    commit_counts = choices(range(1, max_commits + 1), k=total_days)
+    
+    # Precompute which days fall on a weekend
+    if config.no_weekends:
+        start_weekday = start.weekday()
+        skip_day = [(start_weekday + i) % 7 >= 5 for i in range(total_days)]
+    else:
+        skip_day = [False] * total_days
+    
+    days = [
+        (day_offset, commit_counts[day_offset])
+        for day_offset in range(total_days)
+        if not skip_day[day_offset] and freq_rolls[day_offset] <= config.frequency
+    ]
+    if not days:
+        return
+    print(f"Generating {sum(n for _, n in days)} commits...")
+    
+    # Every commit has the same README, so emit the blob once and
+    # reference its mark from each tree
+    content = README_CONTENT.encode("utf-8")
+    blob_mark = 1
+    yield b"blob\nmark :%d\ndata %d\n%s\n" % (blob_mark, len(content), content)
+    
+    # Commit counts are known up front, so each shard's first mark and
+    # parent are too and shards can be rendered independently
+    shard_days: list[list[tuple[int, int]]] = []
+    shard_marks: list[int] = []
+    shard_parents: list[int | str | None] = []
+    mark = blob_mark + 1
     parent: int | str | None = parent_commit
-    count = 0
+    for i in range(0, len(days), SHARD_DAYS):
+        shard = days[i:i + SHARD_DAYS]
+        shard_days.append(shard)
+        shard_marks.append(mark)
+        shard_parents.append(parent)
+        mark += sum(n for _, n in shard)
+        parent = mark - 1
     
-    tz_offset = time.strftime("%z")
-    start = curr_date.replace(hour=20, minute=0) - timedelta(config.days_before)
-    max_commits = max(1, min(config.max_commits, 20))
+    render = partial(
+        render_commits,
+        start=start,
+        blob_mark=blob_mark,
+        committer=f"committer {name} <{email}> ".encode("utf-8"),
+        tz_offset=TZ_OFFSET,
+    )
+    if config.num_processes > 1 and len(shard_days) > 1:
+        workers = min(config.num_processes, len(shard_days))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(render, shard_days, shard_marks, shard_parents)
+    else:
+        yield from map(render, shard_days, shard_marks, shard_parents)
+
+
+def render_commits(
+    days: list[tuple[int, int]],
+    mark: int,
+    parent: int | str | None,
+    *,
+    start: datetime,
+    blob_mark: int,
+    committer: bytes,
+    tz_offset: bytes,
+) -> bytes:
+    """Render fast-import commit records for (day_offset, commits) pairs."""
+    records: list[bytes] = []
+    base_minutes = start.hour * 60 + start.minute
+    # Commits are stamped with the fixed tz_offset, so read the start's wall
+    # time in that offset rather than in whatever DST rule applied that day
+    sign = -1 if tz_offset.startswith(b"-") else 1
+    offset = sign * (int(tz_offset[1:3]) * 3600 + int(tz_offset[3:5]) * 60)
+    start_epoch = calendar.timegm(start.timetuple()) - offset
+    start_date = start.date()
     
-    for day_offset in range(config.days_before + config.days_after):
-        day = start + timedelta(day_offset)
-        
-        if config.no_weekends and day.weekday() >= 5:
-            continue
-        if randint(0, 100) > config.frequency:
-            continue
-        
-        commits_today = randint(1, max_commits)
+    # Only the shard's first commit can start a history or sit on top of an
+    # existing SHA; every later one follows the previous mark
+    if parent is None:
+        from_line = b""
+    elif isinstance(parent, str):
+        from_line = b"from %s\n" % parent.encode("ascii")
+    else:
+        from_line = b"from :%d\n" % parent
+    
+    # Bake the constant parts of a commit record into one template so each
+    # commit is a single bytes format; '%' in name/email must be escaped
+    record = (
+        b"commit refs/heads/main\nmark :%d\n"
+        + committer.replace(b"%", b"%%")
+        + b"%d " + tz_offset + b"\ndata %d\n%s\n%s"
+        + b"M 100644 :%d README.md\n\n" % blob_mark
+    )
+    
+    for day_offset, commits_today in days:
+        # Derive per-commit times with integer math from the start epoch;
+        # whole days keep the same wall time in the fixed TZ_OFFSET
+        day_epoch = start_epoch + day_offset * 86400
+        day_str = (start_date + timedelta(day_offset)).isoformat().encode("ascii")
         
         for minute_offset in range(commits_today):
-            commit_time = day + timedelta(minutes=minute_offset)
-            msg = f"Contribution: {commit_time:%Y-%m-%d %H:%M}"
-            timestamp = int(commit_time.timestamp())
-            
-            content_bytes = README_CONTENT.encode("utf-8")
-            parts.append(f"blob\nmark :{mark}\ndata {len(content_bytes)}\n{README_CONTENT}")
-            blob_mark = mark
-            mark += 1
-            
-            msg_bytes = msg.encode("utf-8")
-            commit = [
-                f"commit refs/heads/main",
-                f"mark :{mark}",
-                f"committer {name} <{email}> {timestamp} {tz_offset}",
-                f"data {len(msg_bytes)}",
-                msg,
-            ]
+            hh, mm = divmod(base_minutes + minute_offset, 60)
+            msg = b"Contribution: %s %02d:%02d" % (day_str, hh, mm)
             
-            if parent is not None:
-                if isinstance(parent, str):
-                    commit.append(f"from {parent}")
-                else:
-                    commit.append(f"from :{parent}")
+            records.append(record % (
+                mark, day_epoch + minute_offset * 60, len(msg), msg, from_line,
+            ))
             
-            commit.append(f"M 100644 :{blob_mark} README.md\n")
-            parts.append("\n".join(commit))
-            
-            parent = mark
+            from_line = b"from :%d\n" % mark
             mark += 1
-            count += 1
     
-    if count:
-        print(f"Generating {count} commits...")
-    return "\n".join(parts)
+    # join sizes the result exactly and copies each record once, where a
+    # growing bytearray reallocates and bytes(buf) copies everything again
+    return b"".join(records)
 
 
 def git(*args: str) -> None:
     """Run git command, exit with message on failure."""
     try:
-        subprocess.run(["git", *args], check=True, capture_output=True)
+        subprocess.run(
+            ["git", *args],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
     except subprocess.CalledProcessError as e:
         stderr = e.stderr.decode("utf-8").strip() if e.stderr else "Unknown error"
         sys.exit(f"Git error: {stderr}")
@@ -190,7 +304,11 @@ def git(*args: str) -> None:
 
 def git_try(*args: str) -> bool:
     """Run git command, return True on success, False on failure."""
-    result = subprocess.run(["git", *args], capture_output=True)
+    result = subprocess.run(
+        ["git", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
     return result.returncode == 0
 
 
@@ -216,35 +334,91 @@ def push_to_remote(force: bool, append: bool = False) -> None:
 
 def git_config(key: str) -> str:
     """Read git config value, returns empty string if not set."""
+    return global_git_config().get(key.lower(), "")
+
+
+@lru_cache(maxsize=None)
+def global_git_config() -> dict[str, str]:
+    """Read the whole global git config once, keyed by lowercased name."""
     result = subprocess.run(
-        ["git", "config", "--global", key],
+        ["git", "config", "--global", "--list", "-z"],
         capture_output=True,
         text=True,
     )
-    return result.stdout.strip()
+    entries = (e.partition("\n") for e in result.stdout.split("\0") if e)
+    return {k: v for k, _, v in entries}
 
 
-def git_with_input(*args: str, input_data: str) -> None:
-    """Run git command with stdin, exit with message on failure."""
+def git_fast_import(chunks: Iterable[bytes]) -> bool:
+    """Stream chunks into git fast-import, return True if any were written."""
+    proc = subprocess.Popen(
+        ["git", "fast-import", "--quiet", "--done"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+        # Python's own fds are non-inheritable already (PEP 446), so on
+        # POSIX skip the scan that closes every other fd in the child
+        close_fds=os.name != "posix",
+    )
+    written = False
     try:
-        subprocess.run(
-            ["git", *args],
-            input=input_data.encode("utf-8"),
-            check=True,
-            capture_output=True,
-        )
-    except subprocess.CalledProcessError as e:
-        stderr = e.stderr.decode("utf-8").strip() if e.stderr else "Unknown error"
-        sys.exit(f"Git error: {stderr}")
+        written = write_stream(proc.stdin.fileno(), chunks)
+    except BrokenPipeError:
+        pass  # fast-import died early, its stderr explains why
+    _, stderr = proc.communicate()
+    if proc.returncode != 0:
+        message = stderr.decode("utf-8").strip() if stderr else "Unknown error"
+        sys.exit(f"Git error: {message}")
+    return written
+
+
+def write_stream(fd: int, chunks: Iterable[bytes]) -> bool:
+    """Write chunks and a closing 'done' to fd, return True if any chunks."""
+    written = False
+    
+    # Gather chunks until a pipe buffer's worth is pending, then hand them
+    # to the kernel in one call without copying through a Python buffer
+    pending: list[bytes] = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        written = True
+        if pending_size >= PIPE_BUFFER_SIZE:
+            write_all(fd, pending)
+            pending.clear()
+            pending_size = 0
+    pending.append(b"done\n")
+    write_all(fd, pending)
+    return written
+
+
+def write_all(fd: int, buffers: list[bytes]) -> None:
+    """Write buffers to fd in full, using scatter-gather where available."""
+    if hasattr(os, "writev"):
+        views = [memoryview(b) for b in buffers]
+    else:
+        views = [memoryview(b"".join(buffers))]
+    
+    first = 0
+    while first < len(views):
+        if hasattr(os, "writev"):
+            n = os.writev(fd, views[first:])
+        else:
+            n = os.write(fd, views[first])
+        # Drop fully written buffers and trim a partially written one
+        while first < len(views) and n >= len(views[first]):
+            n -= len(views[first])
+            first += 1
+        if n:
+            views[first] = views[first][n:]
 
 
 def create_directory(repository: Optional[str], curr_date: datetime) -> str:
     """Create and return working directory name."""
     if repository:
-        name = repository.rstrip("/")
-        if name.endswith(".git"):
-            name = name[:-4]
-        name = name.rsplit("/", 1)[-1]
+        name = repo_name_from_url(repository)
     else:
         name = f"repository-{curr_date:%Y-%m-%d-%H-%M-%S}"
     
@@ -254,6 +428,15 @@ def create_directory(repository: Optional[str], curr_date: datetime) -> str:
     return name
 
 
+@lru_cache(maxsize=8)
+def repo_name_from_url(repository: str) -> str:
+    """Derive a directory name from a repository URL or path."""
+    name = repository.rstrip("/")
+    if name.endswith(".git"):
+        name = name[:-4]
+    return name.rsplit("/", 1)[-1]
+
+
 def validate_config(config: Config) -> None:
     """Validate configuration, exit on error."""
     if config.days_before < 0:
@@ -266,6 +449,10 @@ def validate_config(config: Config) -> None:
         sys.exit("Error: max_commits must be between 1 and 20")
     if config.append and not config.repository:
         sys.exit("Error: --append requires --repository")
+    if config.num_processes < 1:
+        sys.exit("Error: num_processes must be at least 1")
+    if config.dry_run and (config.repository or config.force):
+        sys.exit("Error: --dry_run cannot be combined with --repository, --append or --force")
 
 
 def parse_args(args: list[str]) -> Config:
@@ -290,7 +477,13 @@ def parse_args(args: list[str]) -> Config:
     p.add_argument("-f", "--force", action="store_true",
                    help="Force push (overwrites remote history)")
     p.add_argument("-a", "--append", action="store_true",
-                   help="Append to existing repo (clones first, preserves files)")
+                   help="Append to existing repo (fetches first, preserves files)")
+    p.add_argument("-np", "--num_processes", type=int,
+                   default=1,
+                   help="Worker processes for generating commits (only "
+                        "pays off for very long histories)")
+    p.add_argument("-dr", "--dry_run", type=str, metavar="PATH",
+                   help="Write the fast-import stream to PATH, skip all git operations")
     
     a = p.parse_args(args)
     return Config(
@@ -304,6 +497,8 @@ def parse_args(args: list[str]) -> Config:
         user_email=a.user_email,
         force=a.force,
         append=a.append,
+        num_processes=a.num_processes,
+        dry_run=a.dry_run,
     )
 
 
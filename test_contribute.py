@@ -4,7 +4,9 @@ Tests for contribute.py (enhanced fast-import version).
 import os
 import shutil
 import tempfile
+import time
 import unittest
+from datetime import datetime, timedelta, timezone
 from subprocess import check_output
 
 import contribute
@@ -24,6 +26,7 @@ class TestContribute(unittest.TestCase):
         self.assertIsNone(config.repository)
         self.assertFalse(config.force)
         self.assertFalse(config.append)
+        self.assertEqual(config.num_processes, 1)
 
     def test_parse_args_no_weekends(self):
         """Test --no_weekends flag."""
@@ -83,6 +86,139 @@ class TestContribute(unittest.TestCase):
         with self.assertRaises(SystemExit):
             contribute.validate_config(config)
 
+    def test_validate_config_invalid_num_processes(self):
+        """Test validation rejects fewer than one worker process."""
+        config = contribute.Config(
+            no_weekends=False, max_commits=10, frequency=80,
+            days_before=30, days_after=0, repository=None,
+            user_name=None, user_email=None, force=False, append=False,
+            num_processes=0,
+        )
+        with self.assertRaises(SystemExit):
+            contribute.validate_config(config)
+
+    def test_validate_config_dry_run_with_append(self):
+        """Test that --dry_run cannot be combined with --append."""
+        config = contribute.Config(
+            no_weekends=False, max_commits=10, frequency=80,
+            days_before=30, days_after=0,
+            repository='https://github.com/test/repo.git',
+            user_name=None, user_email=None, force=False, append=True,
+            dry_run='stream.fi',
+        )
+        with self.assertRaises(SystemExit):
+            contribute.validate_config(config)
+
+    def test_validate_config_dry_run_with_force(self):
+        """Test that --dry_run cannot be combined with --force."""
+        config = contribute.Config(
+            no_weekends=False, max_commits=10, frequency=80,
+            days_before=30, days_after=0, repository=None,
+            user_name=None, user_email=None, force=True, append=False,
+            dry_run='stream.fi',
+        )
+        with self.assertRaises(SystemExit):
+            contribute.validate_config(config)
+
+    def test_repo_name_from_url(self):
+        """Test directory names derived from repository URLs."""
+        for url in (
+            'git@github.com:user/repo.git',
+            'https://github.com/user/repo.git',
+            'https://github.com/user/repo/',
+        ):
+            self.assertEqual(contribute.repo_name_from_url(url), 'repo')
+
+    def test_iter_fast_import_chunks(self):
+        """Test that the stream is bytes with one commit per day."""
+        config = contribute.Config(
+            no_weekends=False, max_commits=1, frequency=100,
+            days_before=5, days_after=0, repository=None,
+            user_name=None, user_email=None, force=False, append=False,
+        )
+        chunks = list(contribute.iter_fast_import_chunks(
+            config, 'TestUser', 'test@example.com', datetime(2024, 1, 1),
+        ))
+        self.assertTrue(all(isinstance(c, bytes) for c in chunks))
+        stream = b''.join(chunks)
+        self.assertEqual(stream.count(b'commit refs/heads/main\n'), 5)
+        self.assertEqual(stream.count(b'blob\n'), 1)
+        self.assertIn(b'committer TestUser <test@example.com> ', stream)
+
+    def test_iter_fast_import_chunks_no_weekends(self):
+        """Test that --no_weekends skips Saturdays and Sundays."""
+        config = contribute.Config(
+            no_weekends=True, max_commits=1, frequency=100,
+            days_before=7, days_after=0, repository=None,
+            user_name=None, user_email=None, force=False, append=False,
+        )
+        # The 7-day range starts on Monday 2024-01-01
+        stream = b''.join(contribute.iter_fast_import_chunks(
+            config, 'TestUser', 'test@example.com', datetime(2024, 1, 8),
+        ))
+        self.assertEqual(stream.count(b'commit refs/heads/main\n'), 5)
+        self.assertNotIn(b'2024-01-06', stream)
+        self.assertNotIn(b'2024-01-07', stream)
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), 'needs time.tzset')
+    def test_render_commits_across_dst(self):
+        """Test that timestamps in the fixed offset match the message."""
+        original_tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'Europe/Berlin'
+        time.tzset()
+        try:
+            # Start in winter (+0100) while stamping with summer's +0200
+            records = contribute.render_commits(
+                [(0, 1), (250, 1)], 2, None,
+                start=datetime(2026, 2, 7, 20, 0),
+                blob_mark=1,
+                committer=b'committer TestUser <test@example.com> ',
+                tz_offset=b'+0200',
+            ).split(b'commit refs/heads/main\n')[1:]
+        finally:
+            if original_tz is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = original_tz
+            time.tzset()
+
+        offset = timezone(timedelta(hours=2))
+        for record in records:
+            lines = record.split(b'\n')
+            timestamp = int(lines[1].split(b' ')[-2])
+            wall = datetime.fromtimestamp(timestamp, offset)
+            message = f'Contribution: {wall:%Y-%m-%d %H:%M}'.encode()
+            self.assertEqual(lines[3], message)
+
+    def test_iter_fast_import_chunks_parallel(self):
+        """Test that shards rendered in parallel keep a linear history."""
+        config = contribute.Config(
+            no_weekends=False, max_commits=1, frequency=100,
+            days_before=200, days_after=0, repository=None,
+            user_name=None, user_email=None, force=False, append=False,
+            num_processes=2,
+        )
+        stream = b''.join(contribute.iter_fast_import_chunks(
+            config, 'TestUser', 'test@example.com', datetime(2024, 1, 1),
+        ))
+        records = stream.split(b'commit refs/heads/main\n')[1:]
+        self.assertEqual(len(records), 200)
+        # Blob is mark 1, each commit sits on top of the previous mark
+        for i, record in enumerate(records):
+            self.assertTrue(record.startswith(b'mark :%d\n' % (i + 2)))
+            if i:
+                self.assertIn(b'from :%d\n' % (i + 1), record)
+
+    def test_write_all(self):
+        """Test that gathered buffers reach the fd in order."""
+        read_fd, write_fd = os.pipe()
+        try:
+            contribute.write_all(write_fd, [b'blob\n', b'', b'commit\n'])
+            self.assertEqual(os.read(read_fd, 64), b'blob\ncommit\n')
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
     def test_commits_generation(self):
         """Test that commits are actually generated."""
         original_dir = os.getcwd()
@@ -122,6 +258,70 @@ class TestContribute(unittest.TestCase):
             os.chdir(original_dir)
             shutil.rmtree(test_dir, ignore_errors=True)
 
+    def test_dry_run(self):
+        """Test that --dry_run writes a replayable stream and no repo."""
+        original_dir = os.getcwd()
+        test_dir = tempfile.mkdtemp(prefix="contrib_test_")
+
+        try:
+            os.chdir(test_dir)
+            contribute.main([
+                '--user_name=TestUser',
+                '--user_email=test@users.noreply.github.com',
+                '-mc=1',
+                '-fr=100',
+                '-db=4',
+                '--dry_run=stream.fi',
+            ])
+            self.assertEqual(os.listdir(test_dir), ['stream.fi'])
+
+            check_output(['git', 'init', '-q', 'replay'])
+            os.chdir('replay')
+            with open(os.path.join(test_dir, 'stream.fi'), 'rb') as f:
+                check_output(['git', 'fast-import', '--quiet'], stdin=f)
+            commit_count = int(check_output(
+                ['git', 'rev-list', '--count', 'refs/heads/main']
+            ).decode('utf-8').strip())
+            self.assertEqual(commit_count, 4)
+        finally:
+            os.chdir(original_dir)
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+    def test_append_mode(self):
+        """Test that --append adds commits on top of the remote history."""
+        original_dir = os.getcwd()
+        test_dir = tempfile.mkdtemp(prefix="contrib_test_")
+        remote = os.path.join(test_dir, 'remote.git')
+        args = [
+            '--user_name=TestUser',
+            '--user_email=test@users.noreply.github.com',
+            '-mc=1',
+            '-fr=100',
+            '-db=3',
+            '-r=' + remote,
+        ]
+
+        def remote_count():
+            return int(check_output(
+                ['git', '--git-dir', remote, 'rev-list', '--count', 'main']
+            ).decode('utf-8').strip())
+
+        try:
+            # Appending to an empty remote starts a fresh history
+            check_output(['git', 'init', '--bare', '-b', 'main', remote])
+            os.mkdir(os.path.join(test_dir, 'initial'))
+            os.chdir(os.path.join(test_dir, 'initial'))
+            contribute.main(args + ['--append'])
+            self.assertEqual(remote_count(), 3)
+
+            os.mkdir(os.path.join(test_dir, 'append'))
+            os.chdir(os.path.join(test_dir, 'append'))
+            contribute.main(args + ['--append'])
+            self.assertEqual(remote_count(), 6)
+        finally:
+            os.chdir(original_dir)
+            shutil.rmtree(test_dir, ignore_errors=True)
+
 
 if __name__ == '__main__':
     unittest.main()